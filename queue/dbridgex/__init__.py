@@ -20,7 +20,20 @@
 # Import DataBridge Queue
 from dbridgex.queue import DataBridgeQueue
 from dbridgex.errors import QueueError
+from dbridgex.store import createStore
+from dbridgex.features import createFactory
 
-# Import Default Implementation
-from dbridgex.store.redis import REDISStore
-from dbridgex.features.mjdl import MJDLFactory
+# The default implementations are imported on first use, so
+# that short-lived processes do not pay for what they don't use
+
+def REDISStore(**config):
+	"""
+	Create an instance of the REDIS store back-end
+	"""
+	return createStore("redis", **config)
+
+def MJDLFactory():
+	"""
+	Create an instance of the Micro-JDL feature factory
+	"""
+	return createFactory("mjdl")
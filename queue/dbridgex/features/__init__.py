@@ -17,6 +17,17 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 
+from dbridgex.registry import Registry
+
+#: The feature factories that can be created by name
+factories = Registry("feature factory")
+factories.register( "mjdl", "dbridgex.features.mjdl.MJDLFactory" )
+
+def createFactory(name):
+	"""
+	Create an instance of the feature factory registered under the specified name
+	"""
+	return factories.create(name)
 
 class FeatureFormatError(Exception):
 	"""
@@ -41,9 +52,19 @@ class FeatureRequirement:
 	def getID(self):
 		"""
 		Return the indexing ID for this feature request.
+
+		Requirements with the same ID share the same job bucket, so
+		equivalent requirements must always return the same ID.
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def getDescription(self):
+		"""
+		Return a human-readable description of this feature request,
+		used for debugging when the ID is not readable.
+		"""
+		return self.getID()
+
 class FeatureOffer:
 	"""
 	A feature offer received from the agent
@@ -63,6 +84,14 @@ class FeatureOffer:
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def getSignature(self):
+		"""
+		Return a hash of the offer description, identical for
+		all the offers with the same description.
+		"""
+		import json, hashlib
+		return hashlib.sha1( json.dumps(self.getDescription(), sort_keys=True) ).hexdigest()
+
 class FeatureMatcher:
 	"""
 	A feature matching class
@@ -17,6 +17,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 
+import json
+import hashlib
+
 from dbridgex.features import FeatureRequirement, FeatureOffer, FeatureMatcher, FeatureFactory
 
 """
@@ -28,9 +31,36 @@ In principle MJDL offers only matching in the following levels:
  * `platform` 	: Platform (None matches any platform)
  * `memory` 	: Minimum memory requirements (None removes this limitation)
  * `priority` 	: The priority of this job. The higher, the more preferred.
+ * `user` 	: The user that submitted this job, used for fair-share scheduling.
 
 """
 
+def canonical_value(value):
+	"""
+	Return a canonical representation of a feature value, where
+	equivalent values (such as 2048 and "2048", or package lists in
+	different order) are identical
+	"""
+
+	# Missing values are kept as-is
+	if value is None:
+		return None
+
+	# Package lists are sorted and de-duplicated
+	if isinstance(value, (list, tuple)):
+		return sorted(set([ canonical_value(v) for v in value ]))
+
+	# Everything else is treated as (unicode) text
+	if isinstance(value, str):
+		return value.decode("utf-8", "replace")
+	return unicode(value)
+
+def canonical_hash(values):
+	"""
+	Return a fixed-length hash of a list of canonical values
+	"""
+	return hashlib.sha1( json.dumps(values) ).hexdigest()
+
 def package_in_list(packageRequirement, packageOfferList):
 	"""
 	Check if a versioned package requirement is found
@@ -59,9 +89,50 @@ class MJDLRequirement(FeatureRequirement):
 		# Priority is a dimention only used by the matcher
 		self.priority = features.get("priority", 0)
 
-	def getID(self):
+		# User is a dimention only used by the scheduling policy
+		self.user = features.get("user", None)
+
+		# Calculate the fingerprint once
+		self.fingerprint = self.calculateFingerprint()
+
+	def __setstate__(self, state):
+		"""
+		Restore a requirement loaded from the store
+		"""
+		self.__dict__.update(state)
+
+		# Requirements stored by earlier versions keep their legacy ID,
+		# since their jobs are already placed in the respective bucket
+		if not "fingerprint" in state:
+			self.fingerprint = self.calculateLegacyID()
+
+	def canonicalForm(self):
+		"""
+		Return the requirements in a canonical, order-independent form,
+		where for example memory 2048 and "2048" are the same
 		"""
-		Calculate a unique ID with the offer specifications that we have
+		return [
+			("platform", canonical_value(self.platform)),
+			("memory", canonical_value(self.memory)),
+			("freeMemory", canonical_value(self.freeMemory)),
+			("swap", canonical_value(self.swap)),
+			("freeSwap", canonical_value(self.freeSwap)),
+			("packages", canonical_value(self.packages)),
+			("priority", canonical_value(self.priority)),
+			("user", canonical_value(getattr(self, "user", None))),
+		]
+
+	def calculateFingerprint(self):
+		"""
+		Calculate a fixed-length fingerprint of the requirements
+		"""
+
+		# Prefix with 'mjdl'
+		return "mjdl:" + canonical_hash([ value for (name, value) in self.canonicalForm() ])
+
+	def calculateLegacyID(self):
+		"""
+		Calculate the ID that earlier versions used for this requirement
 		"""
 
 		# Stringify packages
@@ -79,9 +150,33 @@ class MJDLRequirement(FeatureRequirement):
 			":%s" % pkgs_str + \
 			":%s" % str(self.priority)
 
+		# Keep users in different buckets
+		user = getattr(self, "user", None)
+		if not user is None:
+			nid += ":%s" % str(user)
+
 		# Return index
 		return nid
 
+	def getID(self):
+		"""
+		Return the fingerprint of the requirements
+		"""
+		return self.fingerprint
+
+	def getDescription(self):
+		"""
+		Return a human-readable description of the requirements
+		"""
+		parts = []
+		for (name, value) in self.canonicalForm():
+			if value is None:
+				continue
+			if isinstance(value, list):
+				value = u",".join(value)
+			parts.append( u"%s=%s" % (name, value) )
+		return (u"mjdl " + u" ".join(parts)).encode("utf-8")
+
 
 class MJDLOffer(FeatureOffer):
 	"""
@@ -118,6 +213,15 @@ class MJDLOffer(FeatureOffer):
 			"packages": self.packages,
 		}
 
+	def getSignature(self):
+		"""
+		Return a hash of the canonical form of the offer, identical
+		for all the equivalent offers.
+		"""
+		return canonical_hash([ canonical_value(v) for v in (
+			self.platform, self.memory, self.freeMemory,
+			self.swap, self.freeSwap, self.packages ) ])
+
 class MJDLMatcher(FeatureMatcher):
 	"""
 	An MJDL matcher
@@ -130,6 +234,11 @@ class MJDLMatcher(FeatureMatcher):
 		self.offer = offer
 		self.matchedRequirements = []
 
+		# Canonical set of offered packages, so that byte and
+		# unicode package names compare equal
+		self.offerPackages = set(canonical_value(offer.packages) or [])
+		self.isSorted = True
+
 	def addRequirement(self, req):
 		"""
 		Add a requirement to the process
@@ -156,15 +265,12 @@ class MJDLMatcher(FeatureMatcher):
 				return
 			# If at least one package from offer fails, return
 			for pkg in req.packages:
-				if not package_in_list(pkg, self.offer.packages):
+				if not package_in_list(canonical_value(pkg), self.offerPackages):
 					return
 
-		# Store item in list and sort by priority
+		# Store item in list, it will be sorted by priority when needed
 		self.matchedRequirements.append( req )
-
-		# Sort
-		self.matchedRequirements = sorted(self.matchedRequirements, 
-			key=lambda x: x.priority, reverse=True)
+		self.isSorted = False
 
 	def nextBestOffer(self):
 		"""
@@ -175,6 +281,11 @@ class MJDLMatcher(FeatureMatcher):
 		if not self.matchedRequirements:
 			return None
 
+		# Sort once after the requirements are added
+		if not self.isSorted:
+			self.matchedRequirements.sort( key=lambda x: x.priority, reverse=True )
+			self.isSorted = True
+
 		# Pop next item
 		return self.matchedRequirements.pop(0)
 
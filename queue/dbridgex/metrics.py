@@ -0,0 +1,369 @@
+#
+# DataBridge-X Queue Implementation
+# Copyright (C) 2014-2015  Ioannis Charalampidis, PH-SFT, CERN
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+
+import time
+import threading
+from bisect import bisect_left
+
+from dbridgex.store import StoreBase
+
+#: Default histogram buckets for latencies (in seconds)
+LATENCY_BUCKETS = ( 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5 )
+
+#: Default histogram buckets for counters (round-trips, buckets examined, etc.)
+COUNT_BUCKETS = ( 0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000, 5000 )
+
+class Histogram:
+	"""
+	A cumulative histogram with fixed bucket boundaries
+	"""
+
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		"""
+		Initialize a histogram with the given upper bucket boundaries
+		"""
+		self.bounds = tuple(sorted(buckets))
+		self.counts = [0] * (len(self.bounds) + 1)
+		self.count = 0
+		self.sum = 0.0
+		self.lock = threading.Lock()
+
+	def observe(self, value):
+		"""
+		Account a value in the histogram
+		"""
+		i = bisect_left(self.bounds, value)
+		with self.lock:
+			self.counts[i] += 1
+			self.count += 1
+			self.sum += value
+
+	def snapshot(self):
+		"""
+		Return a consistent copy of the histogram as a dictionary
+		"""
+		with self.lock:
+			counts = list(self.counts)
+			count = self.count
+			total = self.sum
+
+		# Accumulate bucket counts
+		buckets = []
+		acc = 0
+		for bound, n in zip(self.bounds + (float("inf"),), counts):
+			acc += n
+			buckets.append( (bound, acc) )
+
+		# Return snapshot
+		return { 'count': count, 'sum': total, 'buckets': buckets }
+
+class Metrics:
+	"""
+	A registry of histograms that collects the DataBridge queue metrics
+	"""
+
+	def __init__(self):
+		"""
+		Initialize an empty metrics registry
+		"""
+		self.histograms = {}
+		self.lock = threading.Lock()
+
+
+	def histogram(self, name, buckets=LATENCY_BUCKETS):
+		"""
+		Return the histogram with the given name, creating it if missing
+		"""
+		h = self.histograms.get(name)
+		if h is None:
+			with self.lock:
+				h = self.histograms.get(name)
+				if h is None:
+					h = Histogram(buckets)
+					self.histograms[name] = h
+		return h
+
+	def observe(self, name, value, buckets=LATENCY_BUCKETS):
+		"""
+		Account a value in the histogram with the given name
+		"""
+		self.histogram(name, buckets).observe(value)
+
+	def count(self, name, value):
+		"""
+		Account a count (of items, round-trips etc.) in the histogram with the given name
+		"""
+		self.histogram(name, COUNT_BUCKETS).observe(value)
+
+	def snapshot(self):
+		"""
+		Return a dictionary with the snapshot of every histogram
+		"""
+		return dict([ (name, h.snapshot()) for name, h in self.histograms.items() ])
+
+	def prometheus(self, prefix="dbridgex"):
+		"""
+		Render all the histograms in the Prometheus text exposition format
+		"""
+		lines = []
+		for name, snap in sorted(self.snapshot().items()):
+
+			# Sanitize metric name
+			metric = "%s_%s" % (prefix, name.replace(".", "_"))
+			lines.append( "# TYPE %s histogram" % metric )
+
+			# Render buckets
+			for bound, n in snap['buckets']:
+				if bound == float("inf"):
+					le = "+Inf"
+				else:
+					le = repr(bound)
+				lines.append( '%s_bucket{le="%s"} %i' % (metric, le, n) )
+
+			# Render totals
+			lines.append( "%s_sum %r" % (metric, snap['sum']) )
+			lines.append( "%s_count %i" % (metric, snap['count']) )
+
+		return "\n".join(lines) + "\n"
+
+	def serve(self, port=9561, host=""):
+		"""
+		Start a daemon thread that exposes the metrics over HTTP
+		in the Prometheus text format and return the server instance
+		"""
+		import BaseHTTPServer
+
+		metrics = self
+		class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = metrics.prometheus()
+				self.send_response(200)
+				self.send_header("Content-Type", "text/plain; version=0.0.4")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+			def log_message(self, format, *args):
+				pass
+
+		# Start server in a daemon thread
+		server = BaseHTTPServer.HTTPServer( (host, port), MetricsHandler )
+		thread = threading.Thread( target=server.serve_forever )
+		thread.daemon = True
+		thread.start()
+
+		# Return server
+		return server
+
+class InstrumentedStore(StoreBase):
+	"""
+	A store back-end wrapper that measures the latency
+	of every call to the underlaying store.
+	"""
+
+	def __init__(self, store, metrics):
+		"""
+		Wrap the specified store, reporting to the specified metrics registry
+		"""
+		self.store = store
+		self.metrics = metrics
+
+		# Per-thread number of round-trips performed so far
+		self.local = threading.local()
+
+	def roundTrips(self):
+		"""
+		Return the number of store round-trips performed so far by the current thread
+		"""
+		return getattr(self.local, "roundTrips", 0)
+
+	def _call(self, name, *args):
+		"""
+		Forward a call to the underlaying store and measure it
+		"""
+		self.local.roundTrips = self.roundTrips() + 1
+		t_start = time.time()
+		try:
+			return getattr(self.store, name)(*args)
+		finally:
+			self.metrics.observe( "store.%s" % name, time.time() - t_start )
+
+	def get(self, key):
+		"""
+		Return the value of the specified key
+		"""
+		return self._call("get", key)
+
+	def set(self, key, value, expire=None):
+		"""
+		Set a value to the specified key
+		"""
+		if expire is None:
+			return self._call("set", key, value)
+		return self._call("set", key, value, expire)
+
+	def set_many(self, mapping, expire=None):
+		"""
+		Set the values of many keys
+		"""
+		return self._call("set_many", mapping, expire)
+
+	def set_if_missing(self, key, value, expire=None):
+		"""
+		Set a value to the specified key only if the key does not exist
+		"""
+		return self._call("set_if_missing", key, value, expire)
+
+	def increment(self, key):
+		"""
+		Increment the integer value of the specified key and return it
+		"""
+		return self._call("increment", key)
+
+	def remove(self, key):
+		"""
+		Remove a specified key from the database
+		"""
+		return self._call("remove", key)
+
+	def remove_many(self, keys):
+		"""
+		Remove many keys from the database
+		"""
+		return self._call("remove_many", keys)
+
+	def list_push(self, key, value, priority=0):
+		"""
+		Push a value in the FIFO list under the specified key
+		"""
+		return self._call("list_push", key, value, priority)
+
+	def list_push_many(self, key, values):
+		"""
+		Push many values in the FIFO list under the specified key
+		"""
+		return self._call("list_push_many", key, values)
+
+	def list_pop(self, key):
+		"""
+		Pop a value from the FIFO list under the specified key
+		"""
+		return self._call("list_pop", key)
+
+	def list_pop_many(self, key, count):
+		"""
+		Pop up to `count` values from the FIFO list under the specified key
+		"""
+		return self._call("list_pop_many", key, count)
+
+	def list_size(self, key):
+		"""
+		Return the number of elements in the list
+		"""
+		return self._call("list_size", key)
+
+	def set_add(self, key, value):
+		"""
+		Add an item in a set of unique items
+		"""
+		return self._call("set_add", key, value)
+
+	def set_add_many(self, key, values):
+		"""
+		Add many items in a set of unique items
+		"""
+		return self._call("set_add_many", key, values)
+
+	def set_remove(self, key, value):
+		"""
+		Remove an item in a set of unique items
+		"""
+		return self._call("set_remove", key, value)
+
+	def set_members(self, key):
+		"""
+		Return the items of a unique set of items
+		"""
+		return self._call("set_members", key)
+
+	def set_scan(self, key, cursor=0, count=100):
+		"""
+		Incrementally iterate over the items of a unique set of items
+		"""
+		return self._call("set_scan", key, cursor, count)
+
+	def bits_set(self, key, offsets, expire=None):
+		"""
+		Set the bits at the specified offsets of the bit array
+		"""
+		return self._call("bits_set", key, offsets, expire)
+
+	def bits_get(self, key, offsets):
+		"""
+		Return the values of the bits at the specified offsets of the bit array
+		"""
+		return self._call("bits_get", key, offsets)
+
+	def hash_get_all(self, key):
+		"""
+		Return a dictionary with all the fields of the hash under the specified key
+		"""
+		return self._call("hash_get_all", key)
+
+	def hash_get(self, key, field):
+		"""
+		Return the value of a field in the hash under the specified key
+		"""
+		return self._call("hash_get", key, field)
+
+	def hash_get_many(self, key, fields):
+		"""
+		Return a list with the values of the specified fields in the hash
+		"""
+		return self._call("hash_get_many", key, fields)
+
+	def hash_set(self, key, field, value):
+		"""
+		Set the value of a field in the hash under the specified key
+		"""
+		return self._call("hash_set", key, field, value)
+
+	def hash_set_many(self, key, mapping):
+		"""
+		Set the values of many fields in the hash under the specified key
+		"""
+		return self._call("hash_set_many", key, mapping)
+
+	def hash_incr(self, key, field, amount=1):
+		"""
+		Increment the integer value of a field in the hash under the specified key
+		"""
+		return self._call("hash_incr", key, field, amount)
+
+	def hash_remove(self, key, field):
+		"""
+		Remove a field from the hash under the specified key
+		"""
+		return self._call("hash_remove", key, field)
+
+	def hash_remove_many(self, key, fields):
+		"""
+		Remove many fields from the hash under the specified key
+		"""
+		return self._call("hash_remove_many", key, fields)
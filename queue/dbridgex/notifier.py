@@ -1,7 +1,4 @@
 
-import socket
-import json
-
 class UDPNotifier:
 	"""
 	A class that is used to broadcast UDP notifications to
@@ -14,8 +11,8 @@ class UDPNotifier:
 		"""
 		self.targets = []
 
-		# Create a socket to use for sending the messages
-		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		# The socket is created when the first message is sent
+		self.sock = None
 
 	def removeAllTargets(self):
 		"""
@@ -50,9 +47,15 @@ class UDPNotifier:
 			return
 
 		# Calculate the mesage payload
+		import json
 		parameters['event'] = name
 		message = json.dumps(parameters) + "\n"
 
+		# Create a socket to use for sending the messages
+		if self.sock is None:
+			import socket
+			self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
 		# Send message to all targets
 		for t in self.targets:
 			self.sock.sendto(message, t)
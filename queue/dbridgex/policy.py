@@ -0,0 +1,182 @@
+#
+# DataBridge-X Queue Implementation
+# Copyright (C) 2014-2015  Ioannis Charalampidis, PH-SFT, CERN
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+
+import heapq
+
+#: Resolution of the fair-share virtual times (units per job served)
+FAIRSHARE_SCALE = 1000
+
+def _priority(req):
+	"""
+	Return the priority of the specified requirement as a number, since
+	feature specifications may carry it as a string (ex. "5")
+	"""
+	try:
+		return float(getattr(req, "priority", 0) or 0)
+	except (TypeError, ValueError):
+		return 0.0
+
+class SchedulingPolicy:
+	"""
+	A scheduling policy decides the order in which the feature
+	buckets that match an offer are tried by `DataBridgeQueue.pop`
+	"""
+
+	def schedule(self, queue, matcher):
+		"""
+		Return an iterator over (req, state) tuples, with the
+		FeatureRequirement objects of the matched buckets in the
+		order they should be tried. The `state` is passed back to
+		`served` if a job is popped from the respective bucket.
+		"""
+		raise NotImplementedError("Command not implemented")
+
+	def served(self, queue, req, state):
+		"""
+		Account a job that was popped from the bucket of the specified requirement
+		"""
+		pass
+
+	def retired(self, queue, bucket_id):
+		"""
+		Cleanup the state kept for the specified bucket when it's retired
+		"""
+		pass
+
+class PriorityPolicy(SchedulingPolicy):
+	"""
+	The default policy that tries the buckets in the order
+	proposed by the feature matcher
+	"""
+
+	def schedule(self, queue, matcher):
+		"""
+		Return the offers of the matcher as they come
+		"""
+		best = matcher.nextBestOffer()
+		while best:
+			yield (best, None)
+			best = matcher.nextBestOffer()
+
+class FairSharePolicy(SchedulingPolicy):
+	"""
+	A weighted fair-share policy across users and buckets.
+
+	Among the matched buckets with the highest priority, the one
+	whose user, and then the bucket itself, has the smallest virtual
+	start time is tried first. Requirements without a `user` attribute
+	are treated as a user on their own.
+
+	This is start-time fair queuing: every user and bucket has a
+	virtual finish time that advances by 1/weight for every job served,
+	and never starts behind the virtual time of the system (the start
+	time of the last job served). This way entities that were idle for
+	a while, or never served before, get their fair share from now on
+	without claiming the service they missed.
+
+	The virtual times are kept in the `<queue>/served` hash of the store,
+	and the weights are taken from the 'weights' configuration parameter
+	of the queue, a dictionary of user or bucket IDs to a weight (default
+	is 1). Entities with weight 0 are only served when nothing else is.
+	"""
+
+	def schedule(self, queue, matcher):
+		"""
+		Return the offers of the matcher in fair-share order
+		"""
+
+		# Collect matched requirements
+		reqs = []
+		best = matcher.nextBestOffer()
+		while best:
+			reqs.append(best)
+			best = matcher.nextBestOffer()
+		if not reqs:
+			return
+
+		# Collect the fields of the candidates
+		entities = []
+		for req in reqs:
+			user = getattr(req, "user", None)
+			if user is None:
+				entities.append( ("b:%s" % req.getID(), None) )
+			else:
+				entities.append( ("b:%s" % req.getID(), "u:%s" % user) )
+		fields = [ "v:b", "v:u" ] + sorted(set([ f for e in entities for f in e if not f is None ]))
+
+		# Load only the virtual times of the system and the candidates
+		values = queue.backend.hash_get_many( "%s/served" % (queue.queue,), fields )
+		finish = dict([ (f, int(v)) for f, v in zip(fields, values) if not v is None ])
+		weights = queue.config( "weights" ) or {}
+
+		def start(field):
+			# Entities never start behind the virtual time of the system
+			return max( finish.get(field, 0), finish.get("v:%s" % field[0], 0) )
+
+		def weight(field):
+			return max( 0.0, float(weights.get(field[2:], 1)) )
+
+		def order(field):
+			# Entities with zero weight go after everything else
+			if weight(field) == 0:
+				return float("inf")
+			return start(field)
+
+		# Build a heap ordered by priority, user and bucket virtual start time
+		heap = []
+		for i, (req, (f_bucket, f_user)) in enumerate(zip(reqs, entities)):
+			if f_user is None:
+				o_user = order(f_bucket)
+			else:
+				o_user = order(f_user)
+			heap.append( ( -_priority(req), o_user, order(f_bucket), i, req, (f_bucket, f_user) ) )
+		heapq.heapify(heap)
+
+		# Yield the best candidate each time, along with the
+		# virtual times needed for accounting the service
+		while heap:
+			entry = heapq.heappop(heap)
+			state = [ (f, start(f), weight(f), finish.get(f, 0)) for f in entry[-1] if not f is None ]
+			yield (entry[-2], state)
+
+	def served(self, queue, req, state):
+		"""
+		Advance the virtual times of the bucket and its user
+		"""
+		key = "%s/served" % (queue.queue,)
+		system = {}
+		for (field, t_start, w, t_finish) in state:
+			if w == 0:
+				continue
+
+			# Advance finish time from the start time, as an increment
+			# so that concurrent pops are not lost
+			queue.backend.hash_incr( key, field, (t_start - t_finish) + int(round(FAIRSHARE_SCALE / w)) )
+			system[ "v:%s" % field[0] ] = t_start
+
+		# Advance the virtual time of the system
+		if system:
+			queue.backend.hash_set_many( key, system )
+
+	def retired(self, queue, bucket_id):
+		"""
+		Forget the virtual time of the retired bucket
+		"""
+		queue.backend.hash_remove( "%s/served" % (queue.queue,), "b:%s" % bucket_id )
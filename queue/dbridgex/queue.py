@@ -17,33 +17,107 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 
-import json
-import cPickle as pickle
+import time
 
-from dbridgex.features import FeatureOffer, FeatureRequirement, FeatureMatcher, FeatureFormatError
+from dbridgex.features import FeatureOffer, FeatureRequirement, FeatureMatcher, FeatureFormatError, createFactory
+from dbridgex.store import createStore
 from dbridgex.errors import QueueError
 from dbridgex.notifier import UDPNotifier
 
+#: Default number of jobs expected to be pushed in a de-duplication period
+DEDUP_CAPACITY = 1000000
+
+#: Default false-positive rate of the de-duplication bloom filters
+DEDUP_ERROR_RATE = 0.001
+
+#: Default de-duplication period (in seconds), must be shorter than
+#: the time after which expired jobs are rescheduled
+DEDUP_PERIOD = 3600
+
+#: Default number of pops between automatic garbage collections
+GC_EVERY = 100
+
+#: Default number of buckets examined by automatic garbage collections
+GC_BATCH = 20
+
+#: Maximum time (in seconds) a garbage collection can hold the collector lock
+GC_LOCK_TIMEOUT = 60
+
+#: Default time (in seconds) the matches of an offer are cached (0 disables caching)
+OFFER_CACHE_TTL = 0
+
+#: Default time (in seconds) the state of leased and completed jobs is kept
+TRACK_TTL = 86400
+
+def _str(value):
+	"""
+	Return the UTF-8 encoded form of unicode values, as the store returns them
+	"""
+	if isinstance(value, unicode):
+		return value.encode("utf-8")
+	return value
+
+class _MatchList(FeatureMatcher):
+	"""
+	A feature matcher that replays an already matched list of requirements
+	"""
+
+	def __init__(self, matched):
+		"""
+		Initialize with the list of matched requirements
+		"""
+		self.matched = list(matched)
+
+	def nextBestOffer(self):
+		"""
+		Return the next matched requirement
+		"""
+		if not self.matched:
+			return None
+		return self.matched.pop(0)
+
 class DataBridgeQueue:
 	"""
 	Core class that implements the DataBridge queue
 	"""
 
-	def __init__(self, queueName, storeBackend, featureFactory=None):
+	def __init__(self, queueName, storeBackend, featureFactory=None, metrics=None, policy=None):
 		"""
 		Initialize a DataBridge Queue interface
+
+		The store back-end and the feature factory can also be specified
+		by their registered name, such as "redis" and "mjdl".
 		"""
 
+		# Create registered implementations by name
+		if isinstance(storeBackend, basestring):
+			storeBackend = createStore(storeBackend)
+		if isinstance(featureFactory, basestring):
+			featureFactory = createFactory(featureFactory)
+
 		# Keep local of properties
 		self.queue = queueName
 		self.backend = storeBackend
 		self.featureFactory = featureFactory
+		self.metrics = metrics
+		self.policy = policy
+
+		# Use the matcher order if we don't have a scheduling policy
+		if policy is None:
+			from dbridgex.policy import PriorityPolicy
+			self.policy = PriorityPolicy()
+
+		# Measure store calls if we have a metrics registry
+		if not metrics is None:
+			from dbridgex.metrics import InstrumentedStore
+			self.backend = InstrumentedStore(storeBackend, metrics)
 
 		# Load persistent configuration
 		self._config = storeBackend.get( "%s/config" % self.queue )
 		if not self._config:
 			self._config = {}
 		else:
+			import json
 			self._config = json.loads(self._config)
 
 		# Initialize notifier
@@ -79,6 +153,7 @@ class DataBridgeQueue:
 			return self._config[parm]
 
 		# Update configuration property
+		import json
 		self._config[parm] = value
 		self.backend.set( "%s/config" % self.queue, json.dumps(self._config) )
 
@@ -89,6 +164,334 @@ class DataBridgeQueue:
 		"""
 		Push a job in the queue, optionally specifying
 		additional run-time specifications such as JDL
+
+		Returns False if de-duplication is enabled and the
+		job is already in the queue, True otherwise.
+		"""
+		return len(self._measure( "push", self._pushMany, [jobid], feats )) > 0
+
+	def pushMany(self, jobids, feats=None):
+		"""
+		Push many jobs with the same run-time specifications in
+		the queue, using as few store round-trips as possible
+
+		Returns the list of job IDs that were actually queued.
+		"""
+		return self._measure( "pushMany", self._pushMany, jobids, feats )
+
+	def pop(self, feats=None):
+		"""
+		Pop a job from the queue, that satisfies the features received
+		by the worker node.
+		"""
+		item = self._measure( "pop", self._pop, feats )
+
+		# Retire empty buckets every once in a while
+		self._autoCollect()
+
+		# Return item
+		return item
+
+	def _autoCollect(self):
+		"""
+		Run a small garbage collection batch on roughly one out of
+		every 'gcEvery' pops (default is 100, 0 disables it)
+		"""
+		if self.featureFactory is None:
+			return
+		every = int(self._config.get('gcEvery', GC_EVERY))
+		if every <= 0:
+			return
+
+		import random
+		if random.randint(1, every) == 1:
+
+			# The job is already popped at this point, so a failed collection
+			# must not fail the pop; the next collection will continue from
+			# where this one stopped
+			try:
+				self.collect( int(self._config.get('gcBatch', GC_BATCH)) )
+			except Exception as e:
+				self._error( "gc", e )
+
+	def complete(self, jobid, result_ref=None):
+		"""
+		Mark a job as completed, optionally specifying a reference
+		to its results, and place it in the completed jobs list
+		"""
+		return self._measure( "complete", self._complete, jobid, result_ref )
+
+	def harvest(self, count=100):
+		"""
+		Fetch up to `count` completed jobs in a single store round-trip
+
+		Returns a list of (jobid, result_ref) tuples, in the order
+		the jobs were completed.
+		"""
+		return self._measure( "harvest", self._harvest, count )
+
+	def state(self, jobid):
+		"""
+		Return the state of the specified job ('queued', 'leased' or 'done'),
+		or None if the job is unknown, its state expired, or job tracking is not enabled
+		"""
+		return self.backend.get( "%s/state/%s" % (self.queue, jobid) )
+
+	def _measure(self, name, func, *args):
+		"""
+		Call the specified function, measuring its latency and
+		the number of store round-trips it performed
+		"""
+
+		# Fast path if we are not collecting metrics
+		if self.metrics is None:
+			return func(*args)
+
+		# Measure operation
+		t_start = time.time()
+		rt_start = self.backend.roundTrips()
+		try:
+			return func(*args)
+		finally:
+			self.metrics.observe( name, time.time() - t_start )
+			self.metrics.count( "%s.roundtrips" % name, self.backend.roundTrips() - rt_start )
+
+	def _lock(self, name, timeout):
+		"""
+		Acquire the named lock of this queue for up to `timeout` seconds,
+		returning a token to release it with, or None if it's already held
+		"""
+		key = "%s/lock/%s" % (self.queue, name)
+		token = repr(time.time() + timeout)
+		if self.backend.set_if_missing( key, token, timeout ):
+			return token
+
+		# Break locks left behind by crashed holders, in case the
+		# store back-end does not support key expiration
+		held = self.backend.get( key )
+		if held and (float(held) < time.time()):
+			self.backend.remove( key )
+			if self.backend.set_if_missing( key, token, timeout ):
+				return token
+
+		# Lock is held by someone else
+		return None
+
+	def _unlock(self, name, token):
+		"""
+		Release the named lock of this queue, if it's still held by us
+		"""
+		key = "%s/lock/%s" % (self.queue, name)
+		if self.backend.get( key ) == token:
+			self.backend.remove( key )
+
+	def _notify(self, name, parameters):
+		"""
+		Send a notification to the listeners, measuring the time it takes
+		"""
+
+		# Fast path if we are not collecting metrics
+		if self.metrics is None:
+			return self.notifier.notify(name, parameters)
+
+		# Measure notification
+		t_start = time.time()
+		self.notifier.notify(name, parameters)
+		self.metrics.observe( "notify", time.time() - t_start )
+
+	def _error(self, operation, e):
+		"""
+		Report an error that should not fail the current operation
+		"""
+		if not self.metrics is None:
+			self.metrics.count( "%s.errors" % operation, 1 )
+		try:
+			self._notify( "queue.error", { 'queue': self.queue, 'operation': operation, 'error': str(e) } )
+		except Exception:
+			pass
+
+	def _dedup(self, jobids):
+		"""
+		Split the specified job IDs into the ones not already known to
+		the de-duplication index, registering them in the process, and
+		the ones rejected as duplicates
+		"""
+
+		# Check configured de-duplication mode
+		mode = self._config.get('dedup', None)
+		if not mode:
+			return (jobids, [])
+
+		# Collapse duplicates within the batch
+		seen = set()
+		unique = []
+		rejected = []
+		for j in jobids:
+			if j in seen:
+				rejected.append(j)
+			else:
+				seen.add(j)
+				unique.append(j)
+
+		# Exact membership set, cleared when jobs are popped
+		if mode == "set":
+			added = self.backend.set_add_many( "%s/jobs" % (self.queue,), unique )
+			accepted = [ j for j, a in zip(unique, added) if a ]
+
+		# Rotating bloom filters of bounded size, where the job IDs are
+		# remembered for one to two periods after they were last pushed
+		elif mode == "bloom":
+			capacity = int(self._config.get('dedupCapacity', DEDUP_CAPACITY))
+			errorRate = float(self._config.get('dedupErrorRate', DEDUP_ERROR_RATE))
+			period = int(self._config.get('dedupPeriod', DEDUP_PERIOD))
+			import math, struct, hashlib
+
+			# Size the filters for the expected number of jobs in a period
+			bits = int(math.ceil( -capacity * math.log(errorRate) / (math.log(2) ** 2) ))
+			hashes = max(1, int(round( bits / float(capacity) * math.log(2) )))
+
+			# Calculate bit offsets of all the jobs using double hashing
+			offsets = []
+			for j in unique:
+				if isinstance(j, unicode):
+					j = j.encode("utf-8")
+				h1, h2 = struct.unpack( "<QQ", hashlib.md5(str(j)).digest() )
+				offsets += [ (h1 + i * h2) % bits for i in range(hashes) ]
+
+			# Register the jobs in the filter of the current period, which is
+			# kept until the end of the next one, and check the previous one
+			generation = int(time.time() / period)
+			current = self.backend.bits_set( "%s/jobs/bloom/%i" % (self.queue, generation), offsets, 2 * period )
+			previous = self.backend.bits_get( "%s/jobs/bloom/%i" % (self.queue, generation - 1), offsets )
+
+			# A job is new if at least one of its bits was not set in either filter
+			accepted = [ j for i, j in enumerate(unique)
+				if not all(current[i*hashes:(i+1)*hashes]) and not all(previous[i*hashes:(i+1)*hashes]) ]
+
+		else:
+			raise QueueError("Unknown de-duplication mode '%s'" % mode)
+
+		# Collect rejected jobs
+		if len(accepted) < len(unique):
+			accepted_set = set(accepted)
+			rejected += [ j for j in unique if not j in accepted_set ]
+
+		return (accepted, rejected)
+
+	def _match(self, f_offer):
+		"""
+		Return the list of feature requirements that match the specified
+		offer, in the order proposed by the feature matcher.
+
+		The result is cached under the signature of the offer, and the
+		cache is invalidated every time a bucket is added or retired.
+		"""
+
+		# Check if caching is enabled
+		import cPickle as pickle
+		cacheTTL = int(self._config.get('offerCacheTTL', OFFER_CACHE_TTL))
+		if cacheTTL > 0:
+
+			# Get the bucket registry generation *before* scanning the registry, so
+			# that a bucket added in the meantime will invalidate our results
+			generation = self.backend.get( "%s/generation" % (self.queue,) )
+			signature = f_offer.getSignature()
+
+			# Look for a cached result of the same generation
+			cached = self.backend.get( "%s/offers/%s" % (self.queue, signature) )
+			if cached:
+				(c_generation, matched) = pickle.loads( cached )
+				if c_generation == generation:
+					if not self.metrics is None:
+						self.metrics.count( "pop.cachehit", 1 )
+					return matched
+
+		# Create a feature matcher
+		matcher = self.featureFactory.createMatcher( f_offer )
+		t_match = 0.0
+
+		# Load list of registered feature IDs
+		feat_ids = self.backend.set_members( "%s/feats" % (self.queue,) )
+		if feat_ids:
+
+			# Iterate over all the registered feature requests				
+			for bucket_id in feat_ids:
+
+				# Load FeatureRequirement object from store
+				f_req_data = self.backend.get( "%s/feats/%s" % (self.queue, bucket_id) )
+				if not f_req_data:
+					# Skip buckets being retired
+					continue
+				t_start = time.time()
+				try:
+					f_req = pickle.loads( f_req_data )
+				except pickle.UnpicklingError:
+					# Skip this problematic feature
+					continue
+				finally:
+					if not self.metrics is None:
+						self.metrics.observe( "pop.unpickle", time.time() - t_start )
+
+				# Add a feature to cmpare against
+				t_start = time.time()
+				matcher.addRequirement( f_req )
+				t_match += time.time() - t_start
+
+		# Collect the matched requirements
+		matched = []
+		best = matcher.nextBestOffer()
+		while best:
+			matched.append( best )
+			best = matcher.nextBestOffer()
+
+		# Account the size of the scan
+		if not self.metrics is None:
+			self.metrics.count( "pop.buckets", len(feat_ids or ()) )
+			self.metrics.observe( "pop.match", t_match )
+			if cacheTTL > 0:
+				self.metrics.count( "pop.cachehit", 0 )
+
+		# Update cache
+		if cacheTTL > 0:
+			self.backend.set( "%s/offers/%s" % (self.queue, signature), pickle.dumps( (generation, matched) ), cacheTTL )
+
+		# Return matched requirements
+		return matched
+
+	def _invalidate(self):
+		"""
+		Invalidate the cached offer matches after a change in the bucket registry
+		"""
+		self.backend.increment( "%s/generation" % (self.queue,) )
+
+	def _forget(self, jobid):
+		"""
+		Remove a job from the de-duplication index, allowing it to be pushed again
+
+		The bloom filters cannot forget items, so in 'bloom' mode the job
+		IDs are only forgotten when the respective filters are rotated.
+		"""
+		if self._config.get('dedup', None) == "set":
+			self.backend.set_remove( "%s/jobs" % (self.queue,), jobid )
+
+	def _track(self, jobids, state):
+		"""
+		Update the state of the specified jobs if job tracking is enabled
+
+		Queued jobs are kept until they are popped, but leased jobs may never
+		be completed and completed jobs may never be harvested, so their
+		state expires after `trackTTL` seconds (0 keeps it until it's harvested).
+		"""
+		if not self._config.get('track', False):
+			return
+		expire = None
+		if state != "queued":
+			expire = int(self._config.get('trackTTL', TRACK_TTL)) or None
+		self.backend.set_many( dict([ ("%s/state/%s" % (self.queue, j), state) for j in jobids ]), expire )
+
+	def _pushMany(self, jobids, feats=None):
+		"""
+		Push implementation
 		"""
 
 		# Default queue bucket
@@ -107,24 +510,116 @@ class DataBridgeQueue:
 			# the appropriate job bucket where the job is eventually going to be placed
 			bucket_id = f_req.getID()
 
-			# Store feature requirement in the store
-			self.backend.set( "%s/feats/%s" % (self.queue, bucket_id), pickle.dumps(f_req) )
+		# Skip jobs that are already queued
+		(jobids, rejected) = self._dedup(jobids)
 
-			# Update the set of features
-			self.backend.set_add( "%s/feats" % (self.queue,), bucket_id )
+		# Account and notify rejected duplicates
+		if not self.metrics is None:
+			self.metrics.count( "push.duplicates", len(rejected) )
+		for jobid in rejected:
+			self._notify( "queue.duplicate", { 'queue': self.queue, 'bucket': bucket_id, 'job': jobid } )
+		if not jobids:
+			return jobids
 
 		# According to feature priority add
 		# in the head or in the tail of the queue
-		self.backend.list_push( "%s/bucket/%s" % (self.queue, bucket_id), jobid )
+		queueSize = self.backend.list_push_many( "%s/bucket/%s" % (self.queue, bucket_id), jobids )
+
+		# Register the feature bucket *after* the job is placed, so that a
+		# concurrent garbage collection cannot retire it under our feet
+		if bucket_id != "default":
+
+			# Store feature requirement in the store
+			import cPickle as pickle
+			self.backend.set( "%s/feats/%s" % (self.queue, bucket_id), pickle.dumps(f_req) )
+
+			# Update the set of features, invalidating the cached
+			# offer matches if this is a new bucket
+			if self.backend.set_add( "%s/feats" % (self.queue,), bucket_id ):
+				self._invalidate()
+
+				# Keep a readable description of the bucket for debugging
+				self.backend.hash_set( "%s/labels" % (self.queue,), bucket_id, f_req.getDescription() )
+
+			# Update bucket activity timestamp
+			self.backend.set( "%s/activity/%s" % (self.queue, bucket_id), repr(time.time()) )
+
+		# Mark jobs as queued
+		self._track( jobids, "queued" )
 
 		# Notify listeners
-		self.notifier.notify( "queue.enqueue", { 'queue': self.queue, 'bucket': bucket_id, 'job': jobid,
-			'size': self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) ) } )
+		for i, jobid in enumerate(jobids):
+			self._notify( "queue.enqueue", { 'queue': self.queue, 'bucket': bucket_id, 'job': jobid,
+				'size': queueSize - len(jobids) + i + 1 } )
 
-	def pop(self, feats=None):
+		# Return the jobs queued
+		return jobids
+
+	def _complete(self, jobid, result_ref=None):
 		"""
-		Pop a job from the queue, that satisfies the features received
-		by the worker node.
+		Complete implementation
+		"""
+
+		# Place job in the completed list
+		import json
+		size = self.backend.list_push( "%s/done" % (self.queue,), json.dumps([ jobid, result_ref ]) )
+
+		# Mark job as done
+		self._track( [jobid], "done" )
+
+		# Notify listeners
+		self._notify( "queue.complete", { 'queue': self.queue, 'job': jobid, 'size': size } )
+
+	def _harvest(self, count=100):
+		"""
+		Harvest implementation
+		"""
+
+		# Fetch completed jobs
+		import json
+		completed = [ tuple( _str(f) for f in json.loads(v) )
+			for v in self.backend.list_pop_many( "%s/done" % (self.queue,), count ) ]
+
+		# Forget the state of harvested jobs
+		if completed and self._config.get('track', False):
+			self.backend.remove_many( [ "%s/state/%s" % (self.queue, c[0]) for c in completed ] )
+
+		# Return completed jobs
+		return completed
+
+	def _dequeued(self, bucket_id, item, best=None, state=None):
+		"""
+		Account a job popped from the specified bucket
+
+		The job has already left the store at this point, so errors are
+		reported instead of raised, otherwise the job would be lost.
+		"""
+		try:
+
+			# Account the job served
+			if not best is None:
+				self.policy.served( self, best, state )
+
+			# Forget job from the de-duplication index and mark it as leased
+			self._forget( item )
+			self._track( [item], "leased" )
+
+			# Get queue size
+			queueSize = self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) )
+
+			# Notify once when the bucket is emptied
+			if queueSize == 0:
+				self._notify( "queue.empty", { 'queue': self.queue, 'bucket': bucket_id } )
+
+			# Notify listeners
+			self._notify( "queue.dequeue", { 'queue': self.queue, 'bucket': bucket_id, 'job': item, 'size': queueSize } )
+
+		except Exception as e:
+			self._error( "pop", e )
+
+	def _pop(self, feats=None):
+		"""
+		Pop implementation
 		"""
 
 		# Default queue bucket
@@ -138,22 +633,13 @@ class DataBridgeQueue:
 			if not item:
 
 				# Notify a queue miss
-				self.notifier.notify( "queue.miss", { 'queue': self.queue } )
+				self._notify( "queue.miss", { 'queue': self.queue } )
 
 				# Return empty
 				return None
 
-			# Get queue size
-			queueSize = self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) )
-
-			# Notify once when the queue is emptied
-			if queueSize == 0:
-				self.notifier.notify( "queue.empty", { 'queue': self.queue, 'bucket': bucket_id } )				
-
-			# Notify listeners
-			self.notifier.notify( "queue.dequeue", { 'queue': self.queue, 'bucket': bucket_id, 'job': item, 'size': queueSize } )
-
-			# Return item
+			# Account the job and return it
+			self._dequeued( bucket_id, item )
 			return item
 
 		# If we have client feature specifications handle them now
@@ -165,30 +651,13 @@ class DataBridgeQueue:
 			except FeatureFormatError as e:
 				raise QueueError("Could not receive item on queue: %s" % str(e))
 
-			# Create a feature matcher
-			matcher = self.featureFactory.createMatcher( f_offer )
-
-			# Load list of registered feature IDs
-			feat_ids = self.backend.set_members( "%s/feats" % (self.queue,) )
-			if feat_ids:
-
-				# Iterate over all the registered feature requests				
-				for bucket_id in feat_ids:
+			# Find the buckets that match the offer
+			matcher = _MatchList( self._match( f_offer ) )
 
-					# Load FeatureRequirement object from store
-					try:
-						f_req = pickle.loads( self.backend.get( "%s/feats/%s" % (self.queue, bucket_id) ) )
-					except pickle.UnpicklingError:
-						# Skip this problematic feature
-						continue
-
-					# Add a feature to cmpare against
-					matcher.addRequirement( f_req )
-
-			# Start fetching items from queue and if that
-			# queue is emptied, cleanup and continue
-			best = matcher.nextBestOffer()
-			while best:
+			# Start fetching items from queue in the order decided by the
+			# scheduling policy, and if that queue is empty continue with the
+			# next one. Empty buckets are retired later on by the garbage collector.
+			for (best, state) in self.policy.schedule( self, matcher ):
 
 				# Get matcher ID
 				bucket_id = best.getID()
@@ -196,28 +665,111 @@ class DataBridgeQueue:
 				# Get next item
 				item = self.backend.list_pop( "%s/bucket/%s" % (self.queue, bucket_id) )
 				if not item:
-
-					# If there are no items, cleanup feature specifications
-					# and ask for next best offer
-					self.backend.remove( "%s/feats/%s" % (self.queue, bucket_id) )
-					self.backend.set_remove( "%s/feats" % (self.queue,), bucket_id )
-
-					# Notify listeners
-					self.notifier.notify( "queue.empty", { 'queue': self.queue, 'bucket': bucket_id } )
-
-					# Get next offer
-					best = matcher.nextBestOffer()
 					continue
 
-				# Notify listeners
-				self.notifier.notify( "queue.dequeue", { 'queue': self.queue, 'bucket': bucket_id, 'job': item,
-					'size': self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) ) } )
-
-				# We got an item, return
+				# We got an item, account it and return
+				self._dequeued( bucket_id, item, best, state )
 				return item
 
 			# Notify a queue miss
-			self.notifier.notify( "queue.miss", { 'queue': self.queue, 'offer': f_offer.getDescription() } )
+			self._notify( "queue.miss", { 'queue': self.queue, 'offer': f_offer.getDescription() } )
 
 		# Return None if we couldn't find anything
 		return None
+
+	def collect(self, count=100, idle=None):
+		"""
+		Incrementally retire empty feature buckets.
+
+		Every call examines a batch of roughly `count` registered
+		buckets, continuing from where the previous call stopped, and
+		retires the ones that are empty and had no job pushed in them
+		for at least `idle` seconds. If `idle` is missing, the 'gcIdle'
+		configuration parameter is used (default is 60 seconds).
+
+		Only one collector runs at a time; if another entity is
+		already collecting, this function returns immediately.
+
+		Returns the number of buckets retired.
+		"""
+
+		# Only one collector can run at a time, otherwise a collector could
+		# remove a bucket that another one is restoring
+		token = self._lock( "gc", GC_LOCK_TIMEOUT )
+		if token is None:
+			return 0
+		try:
+			return self._collect(count, idle)
+		finally:
+			self._unlock( "gc", token )
+
+	def _restore(self, bucket_id, f_req_data):
+		"""
+		Register again a bucket that a push used while it was being retired
+		"""
+		if f_req_data:
+			import cPickle as pickle
+			self.backend.set( "%s/feats/%s" % (self.queue, bucket_id), f_req_data )
+			try:
+				label = pickle.loads( f_req_data ).getDescription()
+				self.backend.hash_set( "%s/labels" % (self.queue,), bucket_id, label )
+			except pickle.UnpicklingError:
+				pass
+		self.backend.set( "%s/activity/%s" % (self.queue, bucket_id), repr(time.time()) )
+		self.backend.set_add( "%s/feats" % (self.queue,), bucket_id )
+		self._invalidate()
+
+	def _collect(self, count=100, idle=None):
+		"""
+		Collect implementation
+		"""
+
+		# Get idle time threshold
+		if idle is None:
+			idle = float(self._config.get('gcIdle', 60))
+
+		# Fetch the next batch of buckets and keep the cursor for the next call
+		cursor = int(self.backend.get( "%s/gc" % (self.queue,) ) or 0)
+		(cursor, bucket_ids) = self.backend.set_scan( "%s/feats" % (self.queue,), cursor, count )
+		self.backend.set( "%s/gc" % (self.queue,), str(cursor) )
+
+		# Check the buckets
+		now = time.time()
+		retired = 0
+		for bucket_id in bucket_ids:
+
+			# Skip buckets that still have jobs
+			if self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) ) > 0:
+				continue
+
+			# Skip recently used buckets
+			lastActive = self.backend.get( "%s/activity/%s" % (self.queue, bucket_id) )
+			if lastActive and (now - float(lastActive) < idle):
+				continue
+
+			# Cleanup bucket activity, description and scheduling state *before*
+			# unregistering the bucket, so that a push registering it again
+			# afterwards keeps its own
+			f_req_data = self.backend.get( "%s/feats/%s" % (self.queue, bucket_id) )
+			self.backend.remove( "%s/activity/%s" % (self.queue, bucket_id) )
+			self.backend.hash_remove( "%s/labels" % (self.queue,), bucket_id )
+			self.policy.retired( self, bucket_id )
+
+			# Unregister the bucket
+			self.backend.set_remove( "%s/feats" % (self.queue,), bucket_id )
+			self.backend.remove( "%s/feats/%s" % (self.queue, bucket_id) )
+
+			# Since `push` places the job before registering the bucket, if a job
+			# is there now a push happened in the meantime, so restore the bucket
+			if self.backend.list_size( "%s/bucket/%s" % (self.queue, bucket_id) ) > 0:
+				self._restore( bucket_id, f_req_data )
+				continue
+
+			self._invalidate()
+			retired += 1
+
+			# Notify listeners
+			self._notify( "queue.retire", { 'queue': self.queue, 'bucket': bucket_id } )
+
+		# Return the number of retired buckets
+		return retired
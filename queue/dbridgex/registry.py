@@ -0,0 +1,70 @@
+#
+# DataBridge-X Queue Implementation
+# Copyright (C) 2014-2015  Ioannis Charalampidis, PH-SFT, CERN
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+from dbridgex.errors import QueueError
+
+class Registry:
+	"""
+	A registry of classes that can be instantiated by name.
+
+	The classes are registered with their full dotted path and the
+	respective module is imported only when they are first used,
+	keeping the cost of importing `dbridgex` low.
+	"""
+
+	def __init__(self, kind):
+		"""
+		Initialize an empty registry for the specified kind of classes
+		"""
+		self.kind = kind
+		self.paths = {}
+		self.classes = {}
+
+	def register(self, name, path):
+		"""
+		Register the class with the specified dotted path under the specified name
+		"""
+		self.paths[name] = path
+		self.classes.pop(name, None)
+
+	def load(self, name):
+		"""
+		Return the class registered under the specified name, importing it if needed
+		"""
+
+		# Check if it's already loaded
+		cls = self.classes.get(name)
+		if not cls is None:
+			return cls
+
+		# Import the module and get the class
+		if not name in self.paths:
+			raise QueueError("Unknown %s '%s'" % (self.kind, name))
+		(module, cls_name) = self.paths[name].rsplit(".", 1)
+		cls = getattr( __import__(module, fromlist=[cls_name]), cls_name )
+
+		# Keep and return class
+		self.classes[name] = cls
+		return cls
+
+	def create(self, name, *args, **kwargs):
+		"""
+		Create an instance of the class registered under the specified name
+		"""
+		return self.load(name)(*args, **kwargs)
@@ -17,6 +17,18 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 
+from dbridgex.registry import Registry
+
+#: The store back-ends that can be created by name
+stores = Registry("store back-end")
+stores.register( "redis", "dbridgex.store.redis.REDISStore" )
+
+def createStore(name, **config):
+	"""
+	Create an instance of the store back-end registered under the specified name
+	"""
+	return stores.create(name, **config)
+
 class StoreBase:
 	"""
 	Base class for a DataBridge store back-end
@@ -28,18 +40,81 @@ class StoreBase:
 		"""
 		raise NotImplementedError("Command not implemented")
 
-	def set(self, key, value):
+	def set(self, key, value, expire=None):
 		"""
 		Set a value to the specified key
+
+		Optionally, if `expire` is specified, the key is
+		removed after the specified number of seconds.
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def set_many(self, mapping, expire=None):
+		"""
+		Set the values of many keys, optionally removing them
+		after `expire` seconds like `set` does
+
+		Back-ends should override this in order to set all the
+		keys in a single round-trip. The default implementation
+		ignores `expire` if the `set` of the back-end doesn't accept it.
+		"""
+		if (not expire is None) and (not self._expires()):
+			expire = None
+		for key, value in mapping.items():
+			if expire is None:
+				self.set(key, value)
+			else:
+				self.set(key, value, expire)
+
+	def _expires(self):
+		"""
+		Check if the `set` of this back-end accepts the `expire`
+		argument, which back-ends written before it was added lack
+		"""
+		import inspect
+		spec = inspect.getargspec(self.set)
+		return (len(spec.args) > 3) or (not spec.varargs is None)
+
+	def set_if_missing(self, key, value, expire=None):
+		"""
+		Set a value to the specified key only if the key does not
+		exist, returning True if the value was set
+
+		Back-ends should override this in order to make the check
+		and the update atomic, and honor `expire`.
+		"""
+		if not self.get(key) is None:
+			return False
+		self.set(key, value)
+		return True
+
+	def increment(self, key):
+		"""
+		Increment the integer value of the specified key and return it
+
+		Back-ends should override this, since the default implementation
+		is built on top of `get` and `set` and it's not atomic.
+		"""
+		value = int(self.get(key) or 0) + 1
+		self.set(key, str(value))
+		return value
+
 	def remove(self, key):
 		"""
 		Remove a specified key from the database
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def remove_many(self, keys):
+		"""
+		Remove many keys from the database
+
+		Back-ends should override this in order to remove all the
+		keys in a single round-trip.
+		"""
+		for key in keys:
+			self.remove(key)
+
 	def list_push(self, key, value, priority=0):
 		"""
 		Push a value in the FIFO list under the specified key
@@ -50,12 +125,39 @@ class StoreBase:
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def list_push_many(self, key, values):
+		"""
+		Push many values in the FIFO list under the specified key
+		and return the number of elements in the list afterwards.
+
+		Back-ends should override this in order to push all the
+		values in a single round-trip.
+		"""
+		for v in values:
+			self.list_push(key, v)
+		return self.list_size(key)
+
 	def list_pop(self, key):
 		"""
 		Pop a value from the FIFO list under the specified key
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def list_pop_many(self, key, count):
+		"""
+		Pop up to `count` values from the FIFO list under the specified key
+
+		Back-ends should override this in order to pop all the
+		values in a single round-trip.
+		"""
+		values = []
+		while len(values) < count:
+			v = self.list_pop(key)
+			if v is None:
+				break
+			values.append(v)
+		return values
+
 	def list_size(self, key):
 		"""
 		Return the number of elements in the list
@@ -64,10 +166,21 @@ class StoreBase:
 
 	def set_add(self, key, value):
 		"""
-		Add an item in a set of unique items
+		Add an item in a set of unique items, returning 1 if
+		the item was added or 0 if it was already there
 		"""
 		raise NotImplementedError("Command not implemented")
 
+	def set_add_many(self, key, values):
+		"""
+		Add many items in a set of unique items, returning a list
+		with 1 for every item added or 0 if it was already there
+
+		Back-ends should override this in order to add all the
+		items in a single round-trip.
+		"""
+		return [ self.set_add(key, v) for v in values ]
+
 	def set_remove(self, key, value):
 		"""
 		Remove an item in a set of unique items
@@ -79,3 +192,140 @@ class StoreBase:
 		Return the items of a unique set of items
 		"""
 		raise NotImplementedError("Command not implemented")
+
+	def set_scan(self, key, cursor=0, count=100):
+		"""
+		Incrementally iterate over the items of a unique set of items
+
+		Returns a tuple with the cursor to use in the next call and
+		a batch of roughly `count` items. The iteration is completed
+		when the returned cursor is 0.
+
+		Back-ends should override this, since the default implementation
+		fetches all the items of the set on every call.
+		"""
+		items = sorted(self.set_members(key) or ())
+		cursor = int(cursor)
+		if cursor + count >= len(items):
+			return (0, items[cursor:])
+		return (cursor + count, items[cursor:cursor + count])
+
+	def bits_set(self, key, offsets, expire=None):
+		"""
+		Set the bits at the specified offsets of the bit array
+		under the specified key, returning a list with their
+		previous values.
+
+		Optionally, if `expire` is specified, the key is
+		removed after the specified number of seconds.
+		"""
+		raise NotImplementedError("Command not implemented")
+
+	def bits_get(self, key, offsets):
+		"""
+		Return a list with the values of the bits at the specified
+		offsets of the bit array under the specified key
+		"""
+		raise NotImplementedError("Command not implemented")
+
+	def _hash_load(self, key):
+		"""
+		Load a hash emulated by the default implementation of the hash functions
+		"""
+		import json
+		value = self.get(key)
+		if not value:
+			return {}
+		return json.loads(value)
+
+	def _hash_save(self, key, h):
+		"""
+		Save a hash emulated by the default implementation of the hash functions
+		"""
+		import json
+		self.set(key, json.dumps(h))
+
+	def hash_get_all(self, key):
+		"""
+		Return a dictionary with all the fields of the hash under the specified key
+
+		Back-ends should override this, since the default implementation
+		keeps the hash JSON-encoded under the specified key and it's not atomic.
+		"""
+		return self._hash_load(key)
+
+	def hash_get(self, key, field):
+		"""
+		Return the value of a field in the hash under the specified key
+
+		Back-ends should override this, since the default implementation
+		keeps the hash JSON-encoded under the specified key and it's not atomic.
+		"""
+		return self._hash_load(key).get(field)
+
+	def hash_get_many(self, key, fields):
+		"""
+		Return a list with the values of the specified fields in the
+		hash under the specified key (None for the missing ones)
+
+		Back-ends should override this in order to get all the
+		fields in a single round-trip.
+		"""
+		return [ self.hash_get(key, f) for f in fields ]
+
+	def hash_set(self, key, field, value):
+		"""
+		Set the value of a field in the hash under the specified key
+
+		Back-ends should override this, since the default implementation
+		keeps the hash JSON-encoded under the specified key and it's not atomic.
+		"""
+		h = self._hash_load(key)
+		h[field] = value
+		self._hash_save(key, h)
+
+	def hash_set_many(self, key, mapping):
+		"""
+		Set the values of many fields in the hash under the specified key
+
+		Back-ends should override this in order to set all the
+		fields in a single round-trip.
+		"""
+		for field, value in mapping.items():
+			self.hash_set(key, field, value)
+
+	def hash_incr(self, key, field, amount=1):
+		"""
+		Increment the integer value of a field in the hash under the
+		specified key and return the new value
+
+		Back-ends should override this, since the default implementation
+		keeps the hash JSON-encoded under the specified key and it's not atomic.
+		"""
+		h = self._hash_load(key)
+		h[field] = int(h.get(field, 0)) + amount
+		self._hash_save(key, h)
+		return h[field]
+
+	def hash_remove(self, key, field):
+		"""
+		Remove a field from the hash under the specified key
+
+		Back-ends should override this, since the default implementation
+		keeps the hash JSON-encoded under the specified key and it's not atomic.
+		"""
+		h = self._hash_load(key)
+		if h.pop(field, None) is None:
+			return 0
+		self._hash_save(key, h)
+		return 1
+
+	def hash_remove_many(self, key, fields):
+		"""
+		Remove many fields from the hash under the specified key
+
+		Back-ends should override this in order to remove all the
+		fields in a single round-trip.
+		"""
+		for field in fields:
+			self.hash_remove(key, field)
@@ -50,11 +50,32 @@ class REDISStore(StoreBase):
 		"""
 		return self.redis.get(self.prefix+key)
 
-	def set(self, key, value):
+	def set(self, key, value, expire=None):
 		"""
 		Update the value of the specified key
 		"""
-		return self.redis.set(self.prefix+key, value)
+		return self.redis.set(self.prefix+key, value, ex=expire)
+
+	def set_many(self, mapping, expire=None):
+		"""
+		Update the values of many keys in a single round-trip
+		"""
+		pipe = self.redis.pipeline(transaction=False)
+		for key, value in mapping.items():
+			pipe.set(self.prefix+key, value, ex=expire)
+		return pipe.execute()
+
+	def set_if_missing(self, key, value, expire=None):
+		"""
+		Atomically set a value to the specified key only if the key does not exist
+		"""
+		return bool(self.redis.set(self.prefix+key, value, ex=expire, nx=True))
+
+	def increment(self, key):
+		"""
+		Increment the integer value of the specified key
+		"""
+		return self.redis.incr(self.prefix+key)
 
 	def remove(self, key):
 		"""
@@ -62,12 +83,27 @@ class REDISStore(StoreBase):
 		"""
 		return self.redis.delete(self.prefix+key)
 
+	def remove_many(self, keys):
+		"""
+		Remove many keys from the database in a single round-trip
+		"""
+		return self.redis.delete(*[ self.prefix+key for key in keys ])
+
 	def set_add(self, key, value):
 		"""
 		Add an item in a set of unique items
 		"""
 		return self.redis.sadd(self.prefix+key, value)
 
+	def set_add_many(self, key, values):
+		"""
+		Add many items in a set of unique items in a single round-trip
+		"""
+		pipe = self.redis.pipeline(transaction=False)
+		for v in values:
+			pipe.sadd(self.prefix+key, v)
+		return pipe.execute()
+
 	def set_remove(self, key, value):
 		"""
 		Remove an item in a set of unique items
@@ -80,6 +116,12 @@ class REDISStore(StoreBase):
 		"""
 		return self.redis.smembers(self.prefix+key)
 
+	def set_scan(self, key, cursor=0, count=100):
+		"""
+		Incrementally iterate over the items of a unique set of items
+		"""
+		return self.redis.sscan(self.prefix+key, cursor=cursor, count=count)
+
 	def list_push(self, key, value, priority=0):
 		"""
 		Set a value to the specified key
@@ -94,14 +136,98 @@ class REDISStore(StoreBase):
 		else:
 			return self.redis.lpush(self.prefix+key, value)
 
+	def list_push_many(self, key, values):
+		"""
+		Push many values in the FIFO list under the specified key
+		"""
+		return self.redis.rpush(self.prefix+key, *values)
+
 	def list_pop(self, key):
 		"""
 		Pop a value from the FIFO list under the specified key
 		"""
 		return self.redis.lpop(self.prefix+key)
 
+	def list_pop_many(self, key, count):
+		"""
+		Pop up to `count` values from the FIFO list in a single round-trip
+		"""
+		pipe = self.redis.pipeline(transaction=True)
+		pipe.lrange(self.prefix+key, 0, count-1)
+		pipe.ltrim(self.prefix+key, count, -1)
+		return pipe.execute()[0]
+
 	def list_size(self, key):
 		"""
 		Return the number of elements in the list
 		"""
 		return self.redis.llen(self.prefix+key)
+
+	def bits_set(self, key, offsets, expire=None):
+		"""
+		Set the bits at the specified offsets in a single round-trip
+		"""
+		pipe = self.redis.pipeline(transaction=True)
+		for o in offsets:
+			pipe.setbit(self.prefix+key, o, 1)
+		if not expire is None:
+			pipe.expire(self.prefix+key, expire)
+			return pipe.execute()[:-1]
+		return pipe.execute()
+
+	def bits_get(self, key, offsets):
+		"""
+		Return the bits at the specified offsets in a single round-trip
+		"""
+		pipe = self.redis.pipeline(transaction=False)
+		for o in offsets:
+			pipe.getbit(self.prefix+key, o)
+		return pipe.execute()
+
+	def hash_get_all(self, key):
+		"""
+		Return a dictionary with all the fields of the hash under the specified key
+		"""
+		return self.redis.hgetall(self.prefix+key)
+
+	def hash_get(self, key, field):
+		"""
+		Return the value of a field in the hash under the specified key
+		"""
+		return self.redis.hget(self.prefix+key, field)
+
+	def hash_get_many(self, key, fields):
+		"""
+		Return the values of the specified fields in the hash in a single round-trip
+		"""
+		return self.redis.hmget(self.prefix+key, fields)
+
+	def hash_set(self, key, field, value):
+		"""
+		Set the value of a field in the hash under the specified key
+		"""
+		return self.redis.hset(self.prefix+key, field, value)
+
+	def hash_set_many(self, key, mapping):
+		"""
+		Set the values of many fields in the hash in a single round-trip
+		"""
+		return self.redis.hmset(self.prefix+key, mapping)
+
+	def hash_incr(self, key, field, amount=1):
+		"""
+		Increment the integer value of a field in the hash under the specified key
+		"""
+		return self.redis.hincrby(self.prefix+key, field, amount)
+
+	def hash_remove(self, key, field):
+		"""
+		Remove a field from the hash under the specified key
+		"""
+		return self.redis.hdel(self.prefix+key, field)
+
+	def hash_remove_many(self, key, fields):
+		"""
+		Remove many fields from the hash in a single round-trip
+		"""
+		return self.redis.hdel(self.prefix+key, *fields)
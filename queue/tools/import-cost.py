@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# DataBridge-X Queue Implementation
+# Copyright (C) 2014-2015  Ioannis Charalampidis, PH-SFT, CERN
+
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+
+"""
+Measure the cost of a cold `import dbridgex`, as paid by every short-lived
+CGI process, and list the modules it loads on top of the bare interpreter.
+
+Usage: import-cost.py [runs]
+"""
+
+import os
+import sys
+import subprocess
+from ast import literal_eval
+
+# The snippet to run in a fresh interpreter
+PROBE = """
+import sys, time
+before = set(sys.modules)
+t_start = time.time()
+import dbridgex
+elapsed = time.time() - t_start
+print repr([ elapsed, sorted(set(sys.modules) - before) ])
+"""
+
+def probe():
+	"""
+	Import dbridgex in a fresh interpreter and return the time it
+	took and the modules it loaded
+	"""
+	root = os.path.join( os.path.dirname(os.path.abspath(__file__)), ".." )
+	env = dict(os.environ)
+	env['PYTHONPATH'] = os.pathsep.join( [ root ] + filter(None, [ env.get('PYTHONPATH') ]) )
+	return literal_eval( subprocess.check_output( [ sys.executable, "-c", PROBE ], env=env ) )
+
+if __name__ == "__main__":
+	runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+	# Take the best of many runs to filter out the noise
+	times = []
+	for i in range(runs):
+		(elapsed, modules) = probe()
+		times.append( elapsed )
+
+	# Report the stand-alone modules, since the packages of dbridgex are expected
+	print "import dbridgex: best %.2f ms, median %.2f ms (%i runs)" % ( min(times) * 1000, sorted(times)[runs / 2] * 1000, runs )
+	modules = [ m for m in modules if not m.startswith("dbridgex") and not '.' in m ]
+	print "modules loaded: %s" % (", ".join(modules) or "none")